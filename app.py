@@ -2,21 +2,37 @@
 from __future__ import annotations
 
 import atexit
+import hashlib
 import logging
 import shutil
 import threading
 from datetime import datetime, timedelta
+from itertools import accumulate
 from pathlib import Path
+from typing import Sequence
 
-from flask import Flask, jsonify, render_template, request
+import orjson
+from flask import Flask, Response, jsonify, render_template, request
 from logging.handlers import RotatingFileHandler
 
-from config import LOG_BACKUP_COUNT, LOG_MAX_BYTES, LOG_PATH, SMOOTHING_WINDOW, TIMEZONE
-from db import fetch_latest_measurement, fetch_measurements_for_day, init_db
+from config import (
+    API_CACHE_MAX_AGE_SECONDS,
+    LOG_BACKUP_COUNT,
+    LOG_MAX_BYTES,
+    LOG_PATH,
+    SMOOTHING_WINDOW,
+    TIMEZONE,
+)
+from db import (
+    fetch_latest_measurement,
+    fetch_measurements_for_day,
+    fetch_range_version,
+    init_db,
+)
 from fan import FanController
 from sensors import read_cpu_temperature_c
-from tasks import measurement_loop
-from weather import fetch_weather
+from tasks import measurement_loop, weather_refresh_loop
+from weather import fetch_weather, fetch_weather_json
 
 
 def setup_logging() -> None:
@@ -37,19 +53,40 @@ def setup_logging() -> None:
     root_logger.addHandler(handler)
 
 
-def smooth_series(values: list[float | None], window: int) -> list[float | None]:
-    """Berechnet den gleitenden Mittelwert für eine Liste von Messwerten."""
+def smooth_series(values: Sequence[float | None], window: int) -> list[float | None]:
+    """Berechnet den gleitenden Mittelwert für eine Liste von Messwerten.
+
+    Präfixsummen über Werte und gültige Einträge (fehlende Werte zählen als 0)
+    liefern Summe und Anzahl jedes Fensters per Differenz, die Akkumulation
+    läuft dabei in C über ``itertools.accumulate``.
+    """
+    sums = [0.0, *accumulate(0.0 if v is None else v for v in values)]
+    counts = [0, *accumulate(v is not None for v in values)]
     smoothed: list[float | None] = []
-    for idx in range(len(values)):
-        start = max(0, idx - window + 1)
-        window_vals = [v for v in values[start : idx + 1] if v is not None]
-        if not window_vals:
-            smoothed.append(None)
+    for end in range(1, len(sums)):
+        start = max(0, end - window)
+        count = counts[end] - counts[start]
+        if count:
+            smoothed.append(round((sums[end] - sums[start]) / count, 2))
         else:
-            smoothed.append(round(sum(window_vals) / len(window_vals), 2))
+            smoothed.append(None)
     return smoothed
 
 
+def _json_response(data: dict) -> Response:
+    """Serialisiert API-Antworten mit orjson (deutlich schneller als jsonify)."""
+    return Response(
+        orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS), mimetype="application/json"
+    )
+
+
+def _cacheable(response: Response, etag: str) -> Response:
+    """Versieht eine API-Antwort mit ETag und kurzer privater Cache-Dauer."""
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = f"private, max-age={API_CACHE_MAX_AGE_SECONDS}"
+    return response
+
+
 def create_app() -> Flask:
     setup_logging()
     init_db()
@@ -99,11 +136,19 @@ def create_app() -> Flask:
         day_start = datetime.combine(day, datetime.min.time(), tzinfo=TIMEZONE)
         day_end = datetime.combine(day, datetime.max.time(), tzinfo=TIMEZONE)
 
+        # ETag aus neuestem Zeitstempel und Anzahl: unveränderte Tage ohne
+        # Abfrage der Messreihe und ohne Glättung mit 304 beantworten
+        latest_ts, count = fetch_range_version(day_start, day_end)
+        etag = hashlib.md5(
+            f"{day.isoformat()}|{latest_ts}|{count}|{SMOOTHING_WINDOW}".encode(),
+            usedforsecurity=False,
+        ).hexdigest()
+        if request.if_none_match.contains(etag):
+            return _cacheable(app.response_class(status=304), etag)
+
         rows = fetch_measurements_for_day(day_start, day_end)
-        times = [row["ts"] for row in rows]
-        temps = [row["temperature_c"] for row in rows]
-        humidity = [row["humidity_percent"] for row in rows]
-        dew = [row["dew_point_c"] for row in rows]
+        epochs, temps, humidity, dew = zip(*rows) if rows else ((), (), (), ())
+        times = [datetime.fromtimestamp(ts, TIMEZONE).isoformat() for ts in epochs]
 
         response = {
             "times": times,
@@ -118,25 +163,18 @@ def create_app() -> Flask:
                 "dew_point": smooth_series(dew, SMOOTHING_WINDOW),
             },
         }
-        return jsonify(response)
+        return _cacheable(_json_response(response), etag)
 
     @app.route("/api/wetter")
     def api_wetter():
-        weather = fetch_weather()
-        return jsonify(
-            {
-                "updated_at": weather.updated_at.isoformat(),
-                "hourly": weather.hourly,
-                "today_summary": weather.today_summary,
-                "warnings": weather.warnings,
-            }
-        )
+        # JSON wird beim Aktualisieren des Caches einmalig erzeugt
+        return Response(fetch_weather_json(), mimetype="application/json")
 
     return app
 
 
 def start_background_tasks() -> threading.Event:
-    """Startet Hintergrundthreads für Messung und Lüfter."""
+    """Startet Hintergrundthreads für Messung, Lüfter und Wetterdaten."""
     stop_event = threading.Event()
 
     fan = FanController()
@@ -145,9 +183,13 @@ def start_background_tasks() -> threading.Event:
         target=measurement_loop, args=(stop_event,), daemon=True
     )
     fan_thread = threading.Thread(target=fan.run_loop, args=(stop_event,), daemon=True)
+    weather_thread = threading.Thread(
+        target=weather_refresh_loop, args=(stop_event,), daemon=True
+    )
 
     measurement_thread.start()
     fan_thread.start()
+    weather_thread.start()
 
     def cleanup():
         stop_event.set()
@@ -161,6 +203,7 @@ def start_background_tasks() -> threading.Event:
 app = create_app()
 
 if __name__ == "__main__":
+    # Nur für lokale Tests; im Betrieb läuft die App unter Gunicorn (gunicorn.conf.py).
     # verhindern, dass Flask reloader doppelte Threads startet
     if not app.debug or threading.current_thread().name == "MainThread":
         start_background_tasks()
@@ -1,12 +1,13 @@
 """Zentrale Konfiguration für den Hausserver.
 
-Alle Zeitstempel werden in lokaler Zeit gespeichert. Verbindliche Zeitzone: Europe/Berlin.
+Messzeitpunkte werden als Unix-Sekunden gespeichert und in lokaler Zeit angezeigt.
+Verbindliche Zeitzone: Europe/Berlin.
 """
 from __future__ import annotations
 
 from zoneinfo import ZoneInfo
 
-# Zeitzone für Speicherung und Anzeige
+# Zeitzone für Anzeige und Tagesgrenzen
 TIMEZONE = ZoneInfo("Europe/Berlin")
 
 # Datenbank
@@ -24,9 +25,11 @@ FAN_PIN = 4
 CPU_TEMP_ON_C = 69.0
 CPU_TEMP_OFF_C = 65.0
 CPU_TEMP_CHECK_SECONDS = 60
+CPU_TEMP_CACHE_SECONDS = 1.0
 
 # Datenaufbewahrung (6 Monate)
 DATA_RETENTION_MONTHS = 6
+PRUNE_INTERVAL_SECONDS = 24 * 60 * 60
 
 # Glättung für Dach-Chart
 SMOOTHING_WINDOW = 4
@@ -34,11 +37,21 @@ SMOOTHING_WINDOW = 4
 # Wetter (DWD OpenData)
 DWD_STATION_ID = "10433"  # Rheinstetten (MOSMIX Station, ggf. anpassen)
 DWD_WARNING_AREA = "Rheinstetten"
+# Cache-Dauer: höchstens WEATHER_CACHE_MINUTES, früher bei erwartetem neuen
+# MOSMIX-Lauf oder endender Warnung, mindestens WEATHER_CACHE_MIN_MINUTES
 WEATHER_CACHE_MINUTES = 60
+WEATHER_CACHE_MIN_MINUTES = 5
+MOSMIX_ISSUE_INTERVAL_HOURS = 6
+MOSMIX_PUBLISH_DELAY_MINUTES = 90
+# Hintergrundaktualisierung so lange vor Ablauf des Caches
+WEATHER_REFRESH_LEAD_SECONDS = 60
+# Gespeicherte DWD-Antworten (für bedingte Abrufe) ohne Abruf seit 2 Tagen löschen
+HTTP_CACHE_RETENTION_SECONDS = 2 * 24 * 60 * 60
 
 # Server
 FLASK_HOST = "0.0.0.0"
 FLASK_PORT = 5000
+API_CACHE_MAX_AGE_SECONDS = 60
 
 # Logging
 LOG_PATH = "/var/log/hausserver/hausserver.log"
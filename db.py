@@ -1,102 +1,278 @@
-"""SQLite Datenbankzugriff für Messungen."""
+"""SQLite Datenbankzugriff für Messungen und den HTTP-Cache der Wetterdaten.
+
+Zeitstempel werden als Unix-Sekunden (INTEGER) gespeichert; die Umrechnung in
+lokale Zeit (Europe/Berlin) erfolgt erst bei der Ausgabe.
+"""
 from __future__ import annotations
 
+import calendar
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Iterable
+from typing import Iterator
 
-from config import DATA_RETENTION_MONTHS, DB_PATH, DB_TIMEOUT_SECONDS, TIMEZONE
+from config import (
+    DATA_RETENTION_MONTHS,
+    DB_PATH,
+    DB_TIMEOUT_SECONDS,
+    HTTP_CACHE_RETENTION_SECONDS,
+    TIMEZONE,
+)
 
 
 CREATE_TABLE_SQL = """
 CREATE TABLE IF NOT EXISTS measurements (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
-    ts TEXT NOT NULL,
+    ts INTEGER NOT NULL,
     temperature_c REAL NOT NULL,
     humidity_percent REAL NOT NULL,
     dew_point_c REAL NOT NULL
 );
 """
 
+# Einmalige Migration von ISO-8601-Text auf Unix-Sekunden
+MIGRATE_TS_SQL = (
+    """
+    CREATE TABLE measurements_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts INTEGER NOT NULL,
+        temperature_c REAL NOT NULL,
+        humidity_percent REAL NOT NULL,
+        dew_point_c REAL NOT NULL
+    );
+    """,
+    """
+    INSERT INTO measurements_new (id, ts, temperature_c, humidity_percent, dew_point_c)
+    SELECT id, CAST(strftime('%s', ts) AS INTEGER), temperature_c, humidity_percent,
+           dew_point_c
+    FROM measurements;
+    """,
+    "DROP TABLE measurements;",
+    "ALTER TABLE measurements_new RENAME TO measurements;",
+)
+
+# Abdeckender Index: Tagesabfragen werden vollständig aus dem Index bedient
 CREATE_INDEX_SQL = """
-CREATE INDEX IF NOT EXISTS idx_measurements_ts ON measurements (ts);
+CREATE INDEX IF NOT EXISTS idx_measurements_ts_cov
+ON measurements (ts, temperature_c, humidity_percent, dew_point_c);
+"""
+
+DROP_LEGACY_INDEX_SQL = """
+DROP INDEX IF EXISTS idx_measurements_ts;
+"""
+
+# Letzte Antwort je URL für bedingte Abrufe (ETag / Last-Modified)
+CREATE_HTTP_CACHE_SQL = """
+CREATE TABLE IF NOT EXISTS http_cache (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    body BLOB NOT NULL,
+    fetched_at INTEGER NOT NULL
+);
+"""
+
+INSERT_MEASUREMENT_SQL = """
+INSERT INTO measurements (ts, temperature_c, humidity_percent, dew_point_c)
+VALUES (?, ?, ?, ?)
 """
 
 
+_LOCAL = threading.local()
+
+
 def get_connection() -> sqlite3.Connection:
-    """Öffnet eine neue Datenbankverbindung mit WAL und Zeitlimit."""
-    conn = sqlite3.connect(DB_PATH, timeout=DB_TIMEOUT_SECONDS)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL;")
-    conn.execute("PRAGMA foreign_keys=ON;")
+    """Liefert die Datenbankverbindung des aktuellen Threads.
+
+    Die Verbindung wird pro Thread einmalig geöffnet (Autocommit, WAL, PRAGMAs)
+    und anschließend wiederverwendet.
+    """
+    conn = getattr(_LOCAL, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(
+            DB_PATH,
+            timeout=DB_TIMEOUT_SECONDS,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL;")
+        # Im WAL-Modus genügt NORMAL: kein fsync pro Commit, nur an Checkpoints
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute("PRAGMA foreign_keys=ON;")
+        conn.execute("PRAGMA temp_store=MEMORY;")
+        conn.execute("PRAGMA cache_size=-2000;")
+        _LOCAL.conn = conn
     return conn
 
 
+@contextmanager
+def transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Führt die Anweisungen im Block als eine Transaktion aus."""
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+@contextmanager
+def _short_lived_connection() -> Iterator[sqlite3.Connection]:
+    """Öffnet eine eigene Verbindung, die nach dem Block geschlossen wird.
+
+    Für Zugriffe aus kurzlebigen Threads (Abruf-Worker der Wetterdaten), deren
+    thread-lokale Verbindung sonst bis zur Garbage Collection offen bliebe.
+    """
+    conn = sqlite3.connect(DB_PATH, timeout=DB_TIMEOUT_SECONDS, isolation_level=None)
+    try:
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        yield conn
+    finally:
+        conn.close()
+
+
+def _ts_column_is_text(conn: sqlite3.Connection) -> bool:
+    """Prüft, ob ``measurements.ts`` noch im alten TEXT-Format vorliegt."""
+    for column in conn.execute("PRAGMA table_info(measurements)"):
+        if column["name"] == "ts":
+            return column["type"].upper() == "TEXT"
+    return False
+
+
 def init_db() -> None:
-    """Initialisiert das Datenbankschema."""
-    with get_connection() as conn:
+    """Initialisiert das Datenbankschema und migriert ggf. alte Zeitstempel."""
+    conn = get_connection()
+    with transaction(conn):
+        if _ts_column_is_text(conn):
+            for statement in MIGRATE_TS_SQL:
+                conn.execute(statement)
         conn.execute(CREATE_TABLE_SQL)
         conn.execute(CREATE_INDEX_SQL)
+        conn.execute(DROP_LEGACY_INDEX_SQL)
+        conn.execute(CREATE_HTTP_CACHE_SQL)
 
 
 def insert_measurement(
     timestamp: datetime, temperature_c: float, humidity_percent: float, dew_point_c: float
 ) -> None:
-    """Speichert eine Messung, anschließend werden alte Daten bereinigt."""
-    ts_local = timestamp.astimezone(TIMEZONE).isoformat()
-    with get_connection() as conn:
+    """Speichert eine Messung."""
+    conn = get_connection()
+    with transaction(conn):
         conn.execute(
-            """
-            INSERT INTO measurements (ts, temperature_c, humidity_percent, dew_point_c)
-            VALUES (?, ?, ?, ?)
-            """,
-            (ts_local, temperature_c, humidity_percent, dew_point_c),
+            INSERT_MEASUREMENT_SQL,
+            (int(timestamp.timestamp()), temperature_c, humidity_percent, dew_point_c),
         )
-        prune_old(conn)
+
+
+def _retention_cutoff(now: datetime) -> datetime:
+    """Liefert den Zeitpunkt DATA_RETENTION_MONTHS Monate vor ``now``.
+
+    Existiert der Tag im Zielmonat nicht (z. B. 31.08. -> Februar), wird auf
+    dessen letzten Tag begrenzt.
+    """
+    year, month_index = divmod(now.year * 12 + now.month - 1 - DATA_RETENTION_MONTHS, 12)
+    month = month_index + 1
+    day = min(now.day, calendar.monthrange(year, month)[1])
+    return now.replace(year=year, month=month, day=day)
 
 
 def prune_old(conn: sqlite3.Connection | None = None) -> None:
     """Entfernt Messungen, die älter als DATA_RETENTION_MONTHS sind."""
-    own_conn = conn is None
-    if own_conn:
+    cutoff = int(_retention_cutoff(datetime.now(TIMEZONE)).timestamp())
+    if conn is None:
         conn = get_connection()
-    assert conn is not None
-
-    cutoff = datetime.now(TIMEZONE)
-    cutoff_month = cutoff.month - DATA_RETENTION_MONTHS
-    year = cutoff.year
-    while cutoff_month <= 0:
-        cutoff_month += 12
-        year -= 1
-    cutoff = cutoff.replace(year=year, month=cutoff_month)
-    cutoff_iso = cutoff.isoformat()
-
-    conn.execute("DELETE FROM measurements WHERE ts < ?", (cutoff_iso,))
-    if own_conn:
-        conn.commit()
-        conn.close()
+    conn.execute("DELETE FROM measurements WHERE ts < ?", (cutoff,))
 
 
 def fetch_latest_measurement() -> sqlite3.Row | None:
     """Liest die neueste Messung."""
-    with get_connection() as conn:
-        row = conn.execute(
-            "SELECT * FROM measurements ORDER BY ts DESC LIMIT 1"
+    return get_connection().execute(
+        "SELECT * FROM measurements ORDER BY ts DESC LIMIT 1"
+    ).fetchone()
+
+
+def fetch_range_version(day_start: datetime, day_end: datetime) -> tuple[int | None, int]:
+    """Liefert neuesten Zeitstempel und Anzahl der Messungen im Zeitraum."""
+    row = get_connection().execute(
+        "SELECT MAX(ts), COUNT(*) FROM measurements WHERE ts BETWEEN ? AND ?",
+        (int(day_start.timestamp()), int(day_end.timestamp())),
+    ).fetchone()
+    return row[0], row[1]
+
+
+def fetch_measurements_for_day(
+    day_start: datetime, day_end: datetime
+) -> list[tuple[int, float, float, float]]:
+    """Liest Messungen für einen Zeitraum.
+
+    Liefert schlanke Tupel ``(ts, temperature_c, humidity_percent, dew_point_c)``
+    statt ``sqlite3.Row``-Objekten, ``ts`` in Unix-Sekunden.
+    """
+    cursor = get_connection().cursor()
+    cursor.row_factory = None
+    return cursor.execute(
+        """
+        SELECT ts, temperature_c, humidity_percent, dew_point_c FROM measurements
+        WHERE ts BETWEEN ? AND ?
+        ORDER BY ts ASC
+        """,
+        (int(day_start.timestamp()), int(day_end.timestamp())),
+    ).fetchall()
+
+
+def fetch_http_cache(url: str) -> sqlite3.Row | None:
+    """Liest die zuletzt gespeicherte Antwort für eine URL."""
+    with _short_lived_connection() as conn:
+        return conn.execute(
+            "SELECT etag, last_modified, body FROM http_cache WHERE url = ?", (url,)
         ).fetchone()
-    return row
 
 
-def fetch_measurements_for_day(day_start: datetime, day_end: datetime) -> Iterable[sqlite3.Row]:
-    """Liest Messungen für einen Zeitraum (lokale Zeit)."""
-    start_iso = day_start.astimezone(TIMEZONE).isoformat()
-    end_iso = day_end.astimezone(TIMEZONE).isoformat()
-    with get_connection() as conn:
-        rows = conn.execute(
+def store_http_cache(
+    url: str,
+    etag: str | None,
+    last_modified: str | None,
+    body: bytes,
+    replaces_prefix: str | None = None,
+) -> None:
+    """Speichert eine Antwort und entfernt Einträge, die lange nicht abgerufen wurden.
+
+    Mit ``replaces_prefix`` werden zusätzlich alle anderen Einträge mit diesem
+    URL-Präfix gelöscht, z. B. ältere Warnungsdateien mit Zeitstempel im Namen,
+    die nie wieder abgerufen werden.
+    """
+    now = int(time.time())
+    with _short_lived_connection() as conn, transaction(conn):
+        conn.execute(
             """
-            SELECT * FROM measurements
-            WHERE ts >= ? AND ts <= ?
-            ORDER BY ts ASC
+            INSERT OR REPLACE INTO http_cache (url, etag, last_modified, body, fetched_at)
+            VALUES (?, ?, ?, ?, ?)
             """,
-            (start_iso, end_iso),
-        ).fetchall()
-    return rows
+            (url, etag, last_modified, body, now),
+        )
+        conn.execute(
+            "DELETE FROM http_cache WHERE fetched_at < ?",
+            (now - HTTP_CACHE_RETENTION_SECONDS,),
+        )
+        if replaces_prefix is not None:
+            # substr statt LIKE: "_" in DWD-Dateinamen wäre ein LIKE-Platzhalter
+            conn.execute(
+                """
+                DELETE FROM http_cache
+                WHERE substr(url, 1, ?) = ? AND url != ?
+                """,
+                (len(replaces_prefix), replaces_prefix, url),
+            )
+
+
+def touch_http_cache(url: str) -> None:
+    """Markiert einen Eintrag nach ``304 Not Modified`` als frisch abgerufen."""
+    with _short_lived_connection() as conn:
+        conn.execute(
+            "UPDATE http_cache SET fetched_at = ? WHERE url = ?", (int(time.time()), url)
+        )
@@ -0,0 +1,23 @@
+"""Gunicorn-Konfiguration für den Hausserver.
+
+Start: ``gunicorn --config gunicorn.conf.py app:app``
+"""
+from __future__ import annotations
+
+from config import FLASK_HOST, FLASK_PORT
+
+bind = f"{FLASK_HOST}:{FLASK_PORT}"
+
+# Genau ein Worker: Messung und Lüftersteuerung belegen GPIO-Pins und dürfen
+# nur einmal laufen. Parallele Anfragen bedient der Thread-Pool.
+workers = 1
+worker_class = "gthread"
+threads = 4
+timeout = 60
+
+
+def post_worker_init(worker) -> None:
+    """Startet die Hintergrundthreads im Worker-Prozess (nach dem Fork)."""
+    from app import start_background_tasks
+
+    start_background_tasks()
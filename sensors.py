@@ -1,16 +1,19 @@
 """Sensorfunktionen (DHT22, CPU-Temperatur)."""
 from __future__ import annotations
 
+import atexit
 import logging
 import math
 import time
 from dataclasses import dataclass
 from datetime import datetime
+from typing import Iterable
 
 import adafruit_dht
 import board
 
 from config import (
+    CPU_TEMP_CACHE_SECONDS,
     DHT_PIN,
     MEASUREMENT_RETRIES,
     MEASUREMENT_RETRY_DELAY_SECONDS,
@@ -28,15 +31,32 @@ class SensorReading:
     dew_point_c: float
 
 
+# Magnus-Koeffizienten (Sonntag 1990) für Wasser
+MAGNUS_A = 17.62
+MAGNUS_B = 243.12
+
+
+def calculate_dew_points(
+    temperatures_c: Iterable[float], humidities_percent: Iterable[float]
+) -> list[float]:
+    """Berechnet Taupunkte in °C für ganze Messreihen (Magnus-Formel).
+
+    Konstanten und ``math.log`` werden lokal gebunden, damit auch lange Reihen
+    (z. B. beim Nachberechnen der gesamten Datenbank) zügig durchlaufen.
+    """
+    a = MAGNUS_A
+    b = MAGNUS_B
+    log = math.log
+    dew_points: list[float] = []
+    for temperature_c, humidity_percent in zip(temperatures_c, humidities_percent):
+        gamma = (a * temperature_c / (b + temperature_c)) + log(humidity_percent / 100.0)
+        dew_points.append(round((b * gamma) / (a - gamma), 2))
+    return dew_points
+
+
 def _calculate_dew_point(temperature_c: float, humidity_percent: float) -> float:
-    """Berechnet den Taupunkt in °C (Magnus-Formel)."""
-    a = 17.62
-    b = 243.12
-    gamma = (a * temperature_c / (b + temperature_c)) + math.log(
-        humidity_percent / 100.0
-    )
-    dew_point = (b * gamma) / (a - gamma)
-    return round(dew_point, 2)
+    """Berechnet den Taupunkt in °C für eine einzelne Messung."""
+    return calculate_dew_points((temperature_c,), (humidity_percent,))[0]
 
 
 def _safe_log(value: float, label: str) -> float:
@@ -47,41 +67,77 @@ def _safe_log(value: float, label: str) -> float:
         raise ValueError(f"Ungültiger Messwert für {label}: {value}")
 
 
+_DHT_DEVICE: adafruit_dht.DHT22 | None = None
+
+
+def _get_dht() -> adafruit_dht.DHT22:
+    """Liefert das DHT22-Gerät; es wird nur einmal pro Prozess initialisiert."""
+    global _DHT_DEVICE
+    if _DHT_DEVICE is None:
+        _DHT_DEVICE = adafruit_dht.DHT22(getattr(board, f"D{DHT_PIN}"))
+    return _DHT_DEVICE
+
+
+def _release_dht() -> None:
+    """Gibt das DHT22-Gerät frei; der nächste Zugriff initialisiert es neu."""
+    global _DHT_DEVICE
+    if _DHT_DEVICE is not None:
+        try:
+            _DHT_DEVICE.exit()
+        except Exception:
+            LOGGER.exception("Fehler beim Freigeben des DHT22")
+        _DHT_DEVICE = None
+
+
+atexit.register(_release_dht)
+
+
 def read_dht22() -> SensorReading | None:
     """Liest den DHT22 Sensor mit Retries und gibt SensorReading zurück."""
-    dht_device = adafruit_dht.DHT22(getattr(board, f"D{DHT_PIN}"))
-    try:
-        for attempt in range(1, MEASUREMENT_RETRIES + 1):
-            try:
-                temperature_c = _safe_log(dht_device.temperature, "Temperatur")
-                humidity_percent = _safe_log(dht_device.humidity, "Luftfeuchtigkeit")
-                dew_point_c = _calculate_dew_point(temperature_c, humidity_percent)
-                return SensorReading(
-                    timestamp=datetime.now(TIMEZONE),
-                    temperature_c=round(temperature_c, 2),
-                    humidity_percent=round(humidity_percent, 2),
-                    dew_point_c=round(dew_point_c, 2),
-                )
-            except RuntimeError as exc:
-                LOGGER.warning(
-                    "DHT22 Lesefehler (Versuch %s/%s): %s",
-                    attempt,
-                    MEASUREMENT_RETRIES,
-                    exc,
-                )
-                time.sleep(MEASUREMENT_RETRY_DELAY_SECONDS)
-            except Exception:
-                LOGGER.exception("Unerwarteter DHT22 Fehler")
-                time.sleep(MEASUREMENT_RETRY_DELAY_SECONDS)
-    finally:
-        dht_device.exit()
+    dht_device = _get_dht()
+    for attempt in range(1, MEASUREMENT_RETRIES + 1):
+        try:
+            temperature_c = _safe_log(dht_device.temperature, "Temperatur")
+            humidity_percent = _safe_log(dht_device.humidity, "Luftfeuchtigkeit")
+            dew_point_c = _calculate_dew_point(temperature_c, humidity_percent)
+            return SensorReading(
+                timestamp=datetime.now(TIMEZONE),
+                temperature_c=round(temperature_c, 2),
+                humidity_percent=round(humidity_percent, 2),
+                dew_point_c=round(dew_point_c, 2),
+            )
+        except RuntimeError as exc:
+            LOGGER.warning(
+                "DHT22 Lesefehler (Versuch %s/%s): %s",
+                attempt,
+                MEASUREMENT_RETRIES,
+                exc,
+            )
+            time.sleep(MEASUREMENT_RETRY_DELAY_SECONDS)
+        except Exception:
+            LOGGER.exception("Unerwarteter DHT22 Fehler")
+            time.sleep(MEASUREMENT_RETRY_DELAY_SECONDS)
 
+    # Alle Versuche fehlgeschlagen: Gerät beim nächsten Lesen neu initialisieren
+    _release_dht()
     LOGGER.error("DHT22 konnte nach %s Versuchen nicht gelesen werden", MEASUREMENT_RETRIES)
     return None
 
 
+_CPU_TEMP_CACHE = {"read_at": float("-inf"), "value": 0.0}
+
+
 def read_cpu_temperature_c() -> float:
-    """Liest die CPU-Temperatur vom Raspberry Pi in °C."""
-    with open("/sys/class/thermal/thermal_zone0/temp", "r", encoding="utf-8") as file:
-        milli_c = float(file.read().strip())
-    return round(milli_c / 1000.0, 2)
+    """Liest die CPU-Temperatur vom Raspberry Pi in °C.
+
+    Aufrufe innerhalb von CPU_TEMP_CACHE_SECONDS liefern den zuletzt gelesenen Wert.
+    """
+    now = time.monotonic()
+    if now - _CPU_TEMP_CACHE["read_at"] < CPU_TEMP_CACHE_SECONDS:
+        return _CPU_TEMP_CACHE["value"]
+    with open("/sys/class/thermal/thermal_zone0/temp", "rb") as file:
+        milli_c = int(file.read())
+    value = round(milli_c / 1000.0, 2)
+    _CPU_TEMP_CACHE["read_at"] = now
+    _CPU_TEMP_CACHE["value"] = value
+    return value
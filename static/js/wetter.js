@@ -53,33 +53,33 @@ function renderSummary(summary) {
   weatherSymbol.textContent = summary.weather_symbol || "—";
 }
 
+function buildWeatherSymbols() {
+  const symbols = new Array(100).fill("☁️");
+  const assign = (from, to, symbol) => {
+    for (let code = from; code <= to; code += 1) {
+      symbols[code] = symbol;
+    }
+  };
+  assign(0, 2, "☀️");
+  assign(3, 4, "⛅");
+  symbols[45] = "🌫️";
+  symbols[48] = "🌫️";
+  assign(51, 67, "🌦️");
+  assign(71, 77, "❄️");
+  assign(80, 82, "🌧️");
+  assign(95, 99, "⛈️");
+  return symbols;
+}
+
+// WMO-Codes 0-99 einmalig auf Symbole abbilden (wie WEATHER_SYMBOLS in weather.py)
+const WEATHER_SYMBOLS = buildWeatherSymbols();
+
 function symbolFromCode(code) {
   if (code == null) {
     return "❔";
   }
   const codeInt = Math.trunc(code);
-  if ([0, 1, 2].includes(codeInt)) {
-    return "☀️";
-  }
-  if ([3, 4].includes(codeInt)) {
-    return "⛅";
-  }
-  if ([45, 48].includes(codeInt)) {
-    return "🌫️";
-  }
-  if (codeInt >= 51 && codeInt <= 67) {
-    return "🌦️";
-  }
-  if (codeInt >= 71 && codeInt <= 77) {
-    return "❄️";
-  }
-  if (codeInt >= 80 && codeInt <= 82) {
-    return "🌧️";
-  }
-  if (codeInt >= 95 && codeInt <= 99) {
-    return "⛈️";
-  }
-  return "☁️";
+  return WEATHER_SYMBOLS[codeInt] ?? "☁️";
 }
 
 const weatherSymbolPlugin = {
@@ -1,19 +1,28 @@
-"""Hintergrundaufgaben für Messungen und Lüftersteuerung."""
+"""Hintergrundaufgaben für Messungen, Lüftersteuerung und Wetterdaten."""
 from __future__ import annotations
 
 import logging
 import threading
 import time
 
-from config import MEASUREMENT_INTERVAL_SECONDS
-from db import insert_measurement
+from config import (
+    MEASUREMENT_INTERVAL_SECONDS,
+    PRUNE_INTERVAL_SECONDS,
+    WEATHER_REFRESH_LEAD_SECONDS,
+)
+from db import insert_measurement, prune_old
 from sensors import read_dht22
+from weather import WEATHER_CACHE, refresh_weather
 
 LOGGER = logging.getLogger(__name__)
 
 
 def measurement_loop(stop_event: threading.Event) -> None:
-    """Liest regelmäßig den DHT22 Sensor und speichert Messungen."""
+    """Liest regelmäßig den DHT22 Sensor und speichert Messungen.
+
+    Alte Messungen werden höchstens einmal pro PRUNE_INTERVAL_SECONDS entfernt.
+    """
+    last_prune: float | None = None
     while not stop_event.is_set():
         reading = None
         try:
@@ -34,4 +43,27 @@ def measurement_loop(stop_event: threading.Event) -> None:
         else:
             LOGGER.error("Keine Messung gespeichert (Sensorfehler)")
 
+        now = time.monotonic()
+        if last_prune is None or now - last_prune >= PRUNE_INTERVAL_SECONDS:
+            try:
+                prune_old()
+            except Exception:
+                LOGGER.exception("Fehler beim Bereinigen alter Messungen")
+            last_prune = now
+
         stop_event.wait(MEASUREMENT_INTERVAL_SECONDS)
+
+
+def weather_refresh_loop(stop_event: threading.Event) -> None:
+    """Hält den Wetter-Cache warm.
+
+    Aktualisiert jeweils WEATHER_REFRESH_LEAD_SECONDS vor Ablauf des Caches, damit
+    Seitenaufrufe nicht auf den DWD-Abruf warten müssen.
+    """
+    while not stop_event.is_set():
+        try:
+            refresh_weather()
+        except Exception:
+            LOGGER.exception("Fehler beim Aktualisieren der Wetterdaten")
+        wait_seconds = WEATHER_CACHE.seconds_remaining() - WEATHER_REFRESH_LEAD_SECONDS
+        stop_event.wait(max(wait_seconds, WEATHER_REFRESH_LEAD_SECONDS))
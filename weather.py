@@ -3,15 +3,31 @@ from __future__ import annotations
 
 import logging
 import re
+import threading
 import time
-import urllib.request
 import xml.etree.ElementTree as ET
+from bisect import bisect_left
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from io import BytesIO
+from typing import IO, Collection, NamedTuple
 from zipfile import ZipFile
 
-from config import DWD_STATION_ID, DWD_WARNING_AREA, TIMEZONE, WEATHER_CACHE_MINUTES
+import orjson
+import requests
+from requests.adapters import HTTPAdapter, Retry
+
+from config import (
+    DWD_STATION_ID,
+    DWD_WARNING_AREA,
+    MOSMIX_ISSUE_INTERVAL_HOURS,
+    MOSMIX_PUBLISH_DELAY_MINUTES,
+    TIMEZONE,
+    WEATHER_CACHE_MIN_MINUTES,
+    WEATHER_CACHE_MINUTES,
+)
+from db import fetch_http_cache, store_http_cache, touch_http_cache
 
 LOGGER = logging.getLogger(__name__)
 
@@ -20,113 +36,299 @@ MOSMIX_URL = (
     "MOSMIX_L/single_stations/{station}/kml/MOSMIX_L_LATEST_{station}.kmz"
 )
 
+# Namensraum der DWD-Erweiterung in MOSMIX-KML (fest durch das DWD-Schema)
+DWD_NS = "https://opendata.dwd.de/weather/lib/pointforecast_dwd_extension_V1_0.xsd"
+DWD_ISSUE_TIME_TAG = f"{{{DWD_NS}}}IssueTime"
+DWD_TIMESTEP_TAG = f"{{{DWD_NS}}}TimeStep"
+DWD_FORECAST_TAG = f"{{{DWD_NS}}}Forecast"
+DWD_VALUE_TAG = f"{{{DWD_NS}}}value"
+DWD_ELEMENT_NAME_ATTR = f"{{{DWD_NS}}}elementName"
+
+KELVIN_OFFSET = 273.15
+
+# Ausgewertete MOSMIX-Elemente (wwP6 dient als Ersatz, falls wwP fehlt)
+MOSMIX_ELEMENTS = frozenset(("TTT", "wwP", "wwP6", "RR1c", "FF", "DD", "ww", "SunD1"))
+
+# Platzhalter für fehlende Werte in MOSMIX-Reihen
+MOSMIX_MISSING_VALUES = frozenset(("-", "-999", "-999.0"))
+
 WARNINGS_BASE_URL = (
     "https://opendata.dwd.de/weather/alerts/cap/COMMUNEUNION_DWD_STAT/"
 )
 
+# CAP-Namensraum der DWD-Warnungen
+CAP_NS = "urn:oasis:names:tc:emergency:cap:1.2"
+CAP_NAMESPACES = {"cap": CAP_NS}
+CAP_INFO_TAG = f"{{{CAP_NS}}}info"
+
+WARNING_AREA_FOLDED = DWD_WARNING_AREA.casefold()
+# Byte-Vorfilter nur für ASCII-Namen: bytes.lower() kennt keine Umlaute
+WARNING_AREA_BYTES = (
+    WARNING_AREA_FOLDED.encode("ascii") if DWD_WARNING_AREA.isascii() else None
+)
+
+# Warnungsdateien tragen einen Zeitstempel im Namen; nur die neueste wird gecacht
+WARNING_FILE_PREFIX = "Z_CAP_C_EDZW_"
+WARNING_FILE_RE = re.compile(
+    rb'href="(Z_CAP_C_EDZW_\d{14}_PVW_STATUS_PREMIUMD\.xml)"'
+)
+
+
+class HourlyEntry(NamedTuple):
+    """Stündlicher Vorhersagewert; als Tupel deutlich kompakter als ein dict."""
+
+    time: str
+    temperature_c: float | None
+    precip_probability: float | None
+    precip_amount: float | None
+    wind_speed: float | None
+    wind_direction: float | None
+    weather_code: float | None
+
+    def to_dict(self) -> dict:
+        return self._asdict()
+
 
 @dataclass
 class WeatherData:
     updated_at: datetime
-    hourly: list[dict]
+    hourly: list[HourlyEntry]
     today_summary: dict
     warnings: list[dict]
+    issue_time: datetime | None = None
 
 
 class WeatherCache:
-    """Einfacher In-Memory-Cache für Wetterdaten."""
+    """Thread-sicherer In-Memory-Cache für Wetterdaten.
+
+    ``inflight`` hält (geschützt durch ``lock``) die laufende Aktualisierung,
+    damit bei abgelaufenem Cache nur ein Thread die Daten beim DWD abruft.
+    """
 
     def __init__(self) -> None:
-        self._timestamp = 0.0
+        self._expires_at = float("-inf")
         self._data: WeatherData | None = None
+        self._json: bytes | None = None
+        self.lock = threading.Lock()
+        self.inflight: Future[WeatherData] | None = None
 
     def get(self) -> WeatherData | None:
         return self._data
 
+    def get_json(self) -> bytes | None:
+        """Liefert die beim Setzen vorab serialisierte API-Antwort."""
+        return self._json
+
+    def get_valid(self) -> WeatherData | None:
+        """Liefert die gecachten Daten, sofern sie noch nicht abgelaufen sind."""
+        data = self._data
+        if data is not None and self.is_valid():
+            return data
+        return None
+
+    def seconds_remaining(self) -> float:
+        """Restlaufzeit des Caches in Sekunden (negativ, wenn abgelaufen)."""
+        return self._expires_at - time.monotonic()
+
     def is_valid(self) -> bool:
-        return (time.time() - self._timestamp) < WEATHER_CACHE_MINUTES * 60
+        # monotone Uhr: Zeitsprünge (NTP, Sommerzeit) beeinflussen den Cache nicht
+        return time.monotonic() < self._expires_at
 
-    def set(self, data: WeatherData) -> None:
+    def set(self, data: WeatherData, failed_sources: Collection[str] = ()) -> None:
+        self._json = orjson.dumps(
+            {
+                "updated_at": data.updated_at.isoformat(),
+                "hourly": [entry.to_dict() for entry in data.hourly],
+                "today_summary": data.today_summary,
+                "warnings": data.warnings,
+            }
+        )
         self._data = data
-        self._timestamp = time.time()
+        lifetime = _cache_lifetime(data, failed_sources)
+        self._expires_at = time.monotonic() + lifetime.total_seconds()
+
+
+def _cache_lifetime(
+    data: WeatherData, failed_sources: Collection[str] = ()
+) -> timedelta:
+    """Bestimmt, wie lange gecachte Wetterdaten ab jetzt gültig sind.
+
+    Obergrenze ist WEATHER_CACHE_MINUTES, da neue Warnungen jederzeit erscheinen
+    können. Früher abgelaufen ist der Cache, sobald der nächste MOSMIX-Lauf
+    (IssueTime + MOSMIX_ISSUE_INTERVAL_HOURS + Veröffentlichungsverzug) verfügbar
+    sein sollte oder eine angezeigte Warnung endet. Untergrenze ist
+    WEATHER_CACHE_MIN_MINUTES, damit ein verspäteter Lauf nicht zu Dauerabrufen führt.
+
+    Konnte eine Quelle (``failed_sources``) nicht geladen werden, etwa weil das
+    Netz nach dem Booten noch nicht bereit ist, gilt nur die Untergrenze, damit
+    der nächste Versuch nicht erst nach WEATHER_CACHE_MINUTES erfolgt.
+    """
+    now = datetime.now(TIMEZONE)
+    if failed_sources:
+        return timedelta(minutes=WEATHER_CACHE_MIN_MINUTES)
+    expiry = now + timedelta(minutes=WEATHER_CACHE_MINUTES)
+    if data.issue_time is not None:
+        next_issue = data.issue_time + timedelta(
+            hours=MOSMIX_ISSUE_INTERVAL_HOURS, minutes=MOSMIX_PUBLISH_DELAY_MINUTES
+        )
+        expiry = min(expiry, next_issue)
+    for warning in data.warnings:
+        try:
+            warning_expires = datetime.fromisoformat(warning["expires"])
+        except (TypeError, ValueError):
+            continue
+        # ohne UTC-Offset nicht mit ``now`` vergleichbar
+        if warning_expires.tzinfo is not None and warning_expires > now:
+            expiry = min(expiry, warning_expires)
+    return max(expiry - now, timedelta(minutes=WEATHER_CACHE_MIN_MINUTES))
 
 
 WEATHER_CACHE = WeatherCache()
 
+HTTP_USER_AGENT = "hausserver/1.0"
+# (Verbindungsaufbau, Lesen) in Sekunden
+HTTP_TIMEOUT_SECONDS = (5, 20)
+
+
+def _create_session() -> requests.Session:
+    """HTTP-Session mit Keep-Alive-Pool: alle DWD-Abrufe teilen sich TLS-Verbindungen.
+
+    Kurzzeitige Verbindungs- und Serverfehler werden mit Backoff wiederholt.
+    """
+    session = requests.Session()
+    session.headers["User-Agent"] = HTTP_USER_AGENT
+    retries = Retry(total=3, backoff_factor=0.3, status_forcelist=(502, 503, 504))
+    session.mount(
+        "https://",
+        HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=retries),
+    )
+    return session
 
-def _download(url: str) -> bytes:
-    with urllib.request.urlopen(url, timeout=20) as response:
-        return response.read()
 
+HTTP_SESSION = _create_session()
 
-def _download_text(url: str) -> str:
-    return _download(url).decode("utf-8", errors="ignore")
 
+def _download(url: str, replaces_prefix: str | None = None) -> bytes:
+    """Lädt eine URL; bekannte Antworten werden bedingt abgerufen.
 
-def _extract_kml_from_kmz(kmz_bytes: bytes) -> bytes:
-    with ZipFile(BytesIO(kmz_bytes)) as zf:
-        for name in zf.namelist():
-            if name.lower().endswith(".kml"):
-                return zf.read(name)
+    Mit gespeichertem ETag/Last-Modified antwortet der DWD bei unveränderten
+    Dateien mit ``304 Not Modified`` ohne Inhalt, der Inhalt kommt dann aus der
+    Datenbank (auch über Neustarts hinweg). ``replaces_prefix`` verdrängt beim
+    Speichern ältere Einträge mit diesem URL-Präfix.
+    """
+    try:
+        cached = fetch_http_cache(url)
+    except Exception:
+        LOGGER.exception("Fehler beim Lesen des HTTP-Caches")
+        cached = None
+
+    headers = {}
+    if cached is not None:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    # requests sendet "Accept-Encoding: gzip, deflate" und entpackt transparent
+    response = HTTP_SESSION.get(url, headers=headers, timeout=HTTP_TIMEOUT_SECONDS)
+    if response.status_code == 304 and cached is not None:
+        try:
+            touch_http_cache(url)
+        except Exception:
+            LOGGER.exception("Fehler beim Aktualisieren des HTTP-Caches")
+        return cached["body"]
+    response.raise_for_status()
+
+    body = response.content
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if etag or last_modified:
+        try:
+            store_http_cache(url, etag, last_modified, body, replaces_prefix)
+        except Exception:
+            LOGGER.exception("Fehler beim Schreiben des HTTP-Caches")
+    return body
+
+
+def _find_kml_member(zf: ZipFile) -> str:
+    for name in zf.namelist():
+        if name.lower().endswith(".kml"):
+            return name
     raise ValueError("KMZ enthält keine KML-Datei")
 
 
-def _parse_mosmix(kml_bytes: bytes) -> tuple[list[dict], dict]:
-    """Parst MOSMIX KML für die gewählte Station."""
-    tree = ET.fromstring(kml_bytes)
+def _parse_dwd_timestamp(text: str) -> datetime:
+    """Parst DWD-Zeitstempel im festen Format ``YYYY-MM-DDTHH:MM:SS.000Z`` (UTC)."""
+    return datetime(
+        int(text[0:4]),
+        int(text[5:7]),
+        int(text[8:10]),
+        int(text[11:13]),
+        int(text[14:16]),
+        int(text[17:19]),
+        tzinfo=timezone.utc,
+    )
 
-    def local_name(tag: str) -> str:
-        return tag.split("}", 1)[-1] if "}" in tag else tag
 
-    def find_value_text(node: ET.Element) -> str:
-        for child in node:
-            if local_name(child.tag) == "value":
-                return child.text or ""
-        return ""
+def _parse_mosmix(kml: IO[bytes]) -> tuple[list[HourlyEntry], dict, datetime | None]:
+    """Parst MOSMIX KML für die gewählte Station.
 
+    Die KML wird per ``iterparse`` gestreamt: Zeitschritte und Forecast-Elemente
+    werden direkt beim Schließen ausgewertet und wieder freigegeben, sobald alle
+    benötigten Elemente vorliegen, wird das Parsen abgebrochen.
+    """
+    issue_time: datetime | None = None
     timesteps: list[datetime] = []
-    for ts in tree.findall(".//{*}TimeStep"):
-        if ts.text:
-            timesteps.append(
-                datetime.fromisoformat(ts.text.replace("Z", "+00:00")).astimezone(
-                    TIMEZONE
-                )
-            )
+    forecasts: dict[str, str] = {}
+    for _, elem in ET.iterparse(kml, events=("end",)):
+        tag = elem.tag
+        if tag == DWD_ISSUE_TIME_TAG:
+            if elem.text:
+                issue_time = _parse_dwd_timestamp(elem.text)
+        elif tag == DWD_TIMESTEP_TAG:
+            if elem.text:
+                timesteps.append(_parse_dwd_timestamp(elem.text))
+            elem.clear()
+        elif tag == DWD_FORECAST_TAG:
+            element_name = elem.get(DWD_ELEMENT_NAME_ATTR)
+            if element_name in MOSMIX_ELEMENTS:
+                forecasts[element_name] = elem.findtext(DWD_VALUE_TAG, default="")
+            elem.clear()
+            if len(forecasts) == len(MOSMIX_ELEMENTS):
+                break
 
-    placemark = tree.find(".//{*}Placemark")
-    if placemark is None:
+    if not forecasts:
         raise ValueError("MOSMIX enthält keine Station")
 
-    forecasts = {}
-    for forecast in placemark.findall(".//{*}Forecast"):
-        element_name = None
-        for attr_name, attr_value in forecast.attrib.items():
-            if (
-                attr_name.endswith("elementName")
-                or local_name(attr_name) == "elementName"
-            ):
-                element_name = attr_value
-                break
-        value = find_value_text(forecast)
-        if element_name:
-            forecasts[element_name] = value.split()
+    # Zeitschritte (UTC) sind aufsteigend sortiert: Bereich heute + morgen per
+    # Bisektion, in lokale Zeit umgerechnet werden nur die übernommenen Schritte
+    today = datetime.now(TIMEZONE).date()
+    window_start = datetime.combine(today, datetime.min.time(), tzinfo=TIMEZONE)
+    window_end = datetime.combine(
+        today + timedelta(days=2), datetime.min.time(), tzinfo=TIMEZONE
+    )
+    keep = slice(bisect_left(timesteps, window_start), bisect_left(timesteps, window_end))
+    kept_steps = timesteps[keep]
+    kept_count = len(kept_steps)
 
     def get_series(name: str) -> list[float | None]:
-        series = forecasts.get(name, [])
-        values: list[float | None] = []
-        for entry in series:
-            if entry in ("-", "", "-999", "-999.0"):
-                values.append(None)
-            else:
-                values.append(float(entry))
-        return values
+        """Wandelt nur die Werte im übernommenen Zeitbereich in Zahlen um.
+
+        Die Reihe wird auf die Anzahl der übernommenen Zeitschritte aufgefüllt
+        (fehlende Werte: None).
+        """
+        missing = MOSMIX_MISSING_VALUES
+        values: list[float | None] = [
+            None if entry in missing else float(entry)
+            for entry in forecasts.get(name, "").split()[keep]
+        ]
+        return values + [None] * (kept_count - len(values))
 
     def get_series_first(names: tuple[str, ...]) -> list[float | None]:
         for name in names:
-            series = get_series(name)
-            if series:
-                return series
-        return []
+            if forecasts.get(name, "").strip():
+                return get_series(name)
+        return [None] * kept_count
 
     temps_k = get_series("TTT")
     precip_prob = get_series_first(("wwP", "wwP6"))
@@ -134,143 +336,248 @@ def _parse_mosmix(kml_bytes: bytes) -> tuple[list[dict], dict]:
     wind_speed = get_series("FF")
     wind_dir = get_series("DD")
     weather_code = get_series("ww")
-    sunshine_daily = get_series("SunD1")
 
-    hourly = []
-    today = datetime.now(TIMEZONE).date()
-    tomorrow = today + timedelta(days=1)
-
-    for idx, ts in enumerate(timesteps):
-        if ts.date() not in (today, tomorrow):
-            continue
-        temp_c = temps_k[idx] - 273.15 if idx < len(temps_k) and temps_k[idx] else None
+    hourly: list[HourlyEntry] = []
+    kelvin = KELVIN_OFFSET
+    max_temp: float | None = None
+    min_temp: float | None = None
+
+    # Reihen sind gleich lang: spaltenweise per zip statt Indexzugriffen je Feld;
+    # Umrechnung nach °C und Tagesextreme in einem Durchlauf
+    for ts, temp_k, probability, amount, speed, direction, code in zip(
+        kept_steps, temps_k, precip_prob, precip_amount, wind_speed, wind_dir, weather_code
+    ):
+        temp_c = None
+        if temp_k is not None:
+            temp_c = round(temp_k - kelvin, 2)
+            if max_temp is None or temp_c > max_temp:
+                max_temp = temp_c
+            if min_temp is None or temp_c < min_temp:
+                min_temp = temp_c
         hourly.append(
-            {
-                "time": ts.isoformat(),
-                "temperature_c": round(temp_c, 2) if temp_c is not None else None,
-                "precip_probability": precip_prob[idx] if idx < len(precip_prob) else None,
-                "precip_amount": precip_amount[idx] if idx < len(precip_amount) else None,
-                "wind_speed": wind_speed[idx] if idx < len(wind_speed) else None,
-                "wind_direction": wind_dir[idx] if idx < len(wind_dir) else None,
-                "weather_code": weather_code[idx] if idx < len(weather_code) else None,
-            }
+            HourlyEntry(
+                time=ts.astimezone(TIMEZONE).isoformat(),
+                temperature_c=temp_c,
+                precip_probability=probability,
+                precip_amount=amount,
+                wind_speed=speed,
+                wind_direction=direction,
+                weather_code=code,
+            )
         )
 
-    today_temps = [h["temperature_c"] for h in hourly if h["temperature_c"] is not None]
     today_summary = {
-        "max_temp": max(today_temps) if today_temps else None,
-        "min_temp": min(today_temps) if today_temps else None,
+        "max_temp": max_temp,
+        "min_temp": min_temp,
         "sunshine_hours": None,
         "weather_symbol": None,
     }
-    if sunshine_daily:
-        sun_today = sunshine_daily[0]
-        if sun_today is not None:
-            today_summary["sunshine_hours"] = round(sun_today / 60.0, 1)
+    # Sonnenscheindauer: nur der erste Wert der Reihe wird benötigt
+    sunshine = forecasts.get("SunD1", "").split(maxsplit=1)
+    if sunshine and sunshine[0] not in MOSMIX_MISSING_VALUES:
+        today_summary["sunshine_hours"] = round(float(sunshine[0]) / 60.0, 1)
 
     today_summary["weather_symbol"] = _weather_symbol_from_code(
-        hourly[0]["weather_code"] if hourly else None
+        hourly[0].weather_code if hourly else None
     )
 
-    return hourly, today_summary
+    return hourly, today_summary, issue_time
 
 
 def _parse_warning_xml(xml_bytes: bytes) -> list[dict]:
-    tree = ET.fromstring(xml_bytes)
+    """Streamt die CAP-Datei und übernimmt nur Warnungen für DWD_WARNING_AREA.
+
+    Jedes ``info``-Element wird nach dem Schließen geprüft und sofort wieder
+    freigegeben; die Textfelder werden nur für passende Gebiete gelesen.
+    """
     warnings: list[dict] = []
+    if WARNING_AREA_BYTES is not None and WARNING_AREA_BYTES not in xml_bytes.lower():
+        # Gebiet kommt im Dokument nicht vor: XML gar nicht erst parsen
+        return warnings
 
-    def local_name(tag: str) -> str:
-        return tag.split("}", 1)[-1] if "}" in tag else tag
-
-    for alert in tree.findall(".//{*}alert"):
-        for info in alert.findall(".//{*}info"):
-            for area in info.findall(".//{*}area"):
-                desc = ""
-                for child in area:
-                    if local_name(child.tag) == "areaDesc":
-                        desc = (child.text or "").strip()
-                        break
-                if not desc:
-                    continue
-                if DWD_WARNING_AREA.lower() not in desc.lower():
-                    continue
-                warnings.append(
-                    {
-                        "area": desc,
-                        "severity": info.findtext(".//{*}severity", default=""),
-                        "onset": info.findtext(".//{*}onset", default=""),
-                        "expires": info.findtext(".//{*}expires", default=""),
-                        "headline": info.findtext(".//{*}headline", default=""),
-                        "description": info.findtext(".//{*}description", default=""),
-                    }
-                )
+    for _, info in ET.iterparse(BytesIO(xml_bytes), events=("end",)):
+        if info.tag != CAP_INFO_TAG:
+            continue
+        for area in info.iterfind("cap:area", CAP_NAMESPACES):
+            desc = area.findtext("cap:areaDesc", "", CAP_NAMESPACES).strip()
+            if not desc or WARNING_AREA_FOLDED not in desc.casefold():
+                continue
+            warnings.append(
+                {
+                    "area": desc,
+                    "severity": info.findtext("cap:severity", "", CAP_NAMESPACES),
+                    "onset": info.findtext("cap:onset", "", CAP_NAMESPACES),
+                    "expires": info.findtext("cap:expires", "", CAP_NAMESPACES),
+                    "headline": info.findtext("cap:headline", "", CAP_NAMESPACES),
+                    "description": info.findtext("cap:description", "", CAP_NAMESPACES),
+                }
+            )
+        info.clear()
     return warnings
 
 
 def _fetch_latest_warning_xml() -> bytes:
-    listing = _download_text(WARNINGS_BASE_URL)
-    matches = re.findall(
-        r'href="(Z_CAP_C_EDZW_\\d{14}_PVW_STATUS_PREMIUMD\\.xml)"', listing
+    listing = _download(WARNINGS_BASE_URL)
+    latest_name = max(
+        (match.group(1) for match in WARNING_FILE_RE.finditer(listing)), default=None
     )
-    if not matches:
+    if latest_name is None:
         raise ValueError("Keine Warnungsdateien gefunden")
-    latest_name = max(matches)
-    return _download(f"{WARNINGS_BASE_URL}{latest_name}")
+    return _download(
+        f"{WARNINGS_BASE_URL}{latest_name.decode('ascii')}",
+        replaces_prefix=f"{WARNINGS_BASE_URL}{WARNING_FILE_PREFIX}",
+    )
+
+
+def _build_weather_symbols() -> tuple[str, ...]:
+    """Erzeugt die Symboltabelle für die WMO-Wettercodes 0-99."""
+    symbols = ["☁️"] * 100
+    for code in (0, 1, 2):
+        symbols[code] = "☀️"
+    for code in (3, 4):
+        symbols[code] = "⛅"
+    for code in (45, 48):
+        symbols[code] = "🌫️"
+    for code in range(51, 68):
+        symbols[code] = "🌦️"
+    for code in range(71, 78):
+        symbols[code] = "❄️"
+    for code in range(80, 83):
+        symbols[code] = "🌧️"
+    for code in range(95, 100):
+        symbols[code] = "⛈️"
+    return tuple(symbols)
+
+
+WEATHER_SYMBOLS = _build_weather_symbols()
 
 
 def _weather_symbol_from_code(code: float | None) -> str:
     if code is None:
         return "❔"
     code_int = int(code)
-    if code_int in (0, 1, 2):
-        return "☀️"
-    if code_int in (3, 4):
-        return "⛅"
-    if code_int in (45, 48):
-        return "🌫️"
-    if 51 <= code_int <= 67:
-        return "🌦️"
-    if 71 <= code_int <= 77:
-        return "❄️"
-    if 80 <= code_int <= 82:
-        return "🌧️"
-    if 95 <= code_int <= 99:
-        return "⛈️"
+    if 0 <= code_int < len(WEATHER_SYMBOLS):
+        return WEATHER_SYMBOLS[code_int]
     return "☁️"
 
 
 def fetch_weather() -> WeatherData:
-    """Lädt Wetterdaten (MOSMIX + Warnungen) mit Cache."""
-    if WEATHER_CACHE.is_valid() and WEATHER_CACHE.get() is not None:
-        return WEATHER_CACHE.get()  # type: ignore[return-value]
+    """Lädt Wetterdaten (MOSMIX + Warnungen) mit Cache.
+
+    Schlägt eine der beiden Quellen fehl, bleiben deren zuletzt erfolgreich
+    geladene Daten erhalten, statt leere Werte auszuliefern. Im Betrieb hält
+    ``tasks.weather_refresh_loop`` den Cache warm, sodass hier in der Regel
+    direkt die gecachten Daten zurückgegeben werden.
+    """
+    data = WEATHER_CACHE.get_valid()
+    if data is not None:
+        return data
+    return _refresh_coalesced(force=False)
+
+
+def refresh_weather() -> WeatherData:
+    """Lädt Wetterdaten unabhängig von der Gültigkeit des Caches neu."""
+    return _refresh_coalesced(force=True)
+
+
+def _refresh_coalesced(force: bool) -> WeatherData:
+    """Aktualisiert den Cache; gleichzeitige Aufrufer warten auf dieselbe Aktualisierung."""
+    with WEATHER_CACHE.lock:
+        if not force:
+            # erneut prüfen: ein anderer Thread kann inzwischen aktualisiert haben
+            data = WEATHER_CACHE.get_valid()
+            if data is not None:
+                return data
+        inflight = WEATHER_CACHE.inflight
+        if inflight is None:
+            inflight = WEATHER_CACHE.inflight = Future()
+            is_owner = True
+        else:
+            is_owner = False
+
+    if not is_owner:
+        return inflight.result()
 
+    try:
+        data = _refresh_weather(WEATHER_CACHE.get())
+    except BaseException as exc:
+        inflight.set_exception(exc)
+        raise
+    else:
+        inflight.set_result(data)
+    finally:
+        with WEATHER_CACHE.lock:
+            WEATHER_CACHE.inflight = None
+    return data
+
+
+def _load_mosmix() -> tuple[list[HourlyEntry], dict, datetime | None]:
+    kmz_bytes = _download(MOSMIX_URL.format(station=DWD_STATION_ID))
+    # KML direkt aus dem Archiv streamen, ohne sie vollständig zu entpacken
+    with ZipFile(BytesIO(kmz_bytes)) as zf, zf.open(_find_kml_member(zf)) as kml:
+        return _parse_mosmix(kml)
+
+
+def _load_warnings() -> list[dict]:
+    return _parse_warning_xml(_fetch_latest_warning_xml())
+
+
+def fetch_weather_json() -> bytes:
+    """Liefert die Wetterdaten als fertig serialisierte JSON-Antwort."""
+    fetch_weather()
+    return WEATHER_CACHE.get_json()  # type: ignore[return-value]
+
+
+def _refresh_weather(previous: WeatherData | None) -> WeatherData:
+    """Ruft MOSMIX und Warnungen ab und legt das Ergebnis im Cache ab.
+
+    Fehlgeschlagene Quellen werden an den Cache gemeldet und verkürzen dessen
+    Gültigkeit, damit zeitnah ein neuer Versuch erfolgt.
+    """
     warnings: list[dict] = []
-    hourly: list[dict] = []
+    hourly: list[HourlyEntry] = []
     today_summary: dict = {
         "max_temp": None,
         "min_temp": None,
         "sunshine_hours": None,
         "weather_symbol": None,
     }
-
-    try:
-        kmz_bytes = _download(MOSMIX_URL.format(station=DWD_STATION_ID))
-        kml_bytes = _extract_kml_from_kmz(kmz_bytes)
-        hourly, today_summary = _parse_mosmix(kml_bytes)
-    except Exception:
-        LOGGER.exception("Fehler beim Laden der MOSMIX Daten")
-
-    try:
-        warnings_xml = _fetch_latest_warning_xml()
-        warnings = _parse_warning_xml(warnings_xml)
-    except Exception:
-        LOGGER.exception("Fehler beim Laden der Wetterwarnungen")
+    issue_time: datetime | None = None
+    if previous is not None:
+        warnings = previous.warnings
+        hourly = previous.hourly
+        today_summary = previous.today_summary
+        issue_time = previous.issue_time
+    failed_sources: set[str] = set()
+
+    # MOSMIX und Warnungen sind unabhängig: parallel laden, Wartezeit = langsamere Quelle
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        mosmix_future = executor.submit(_load_mosmix)
+        warnings_future = executor.submit(_load_warnings)
+
+        try:
+            hourly, today_summary, issue_time = mosmix_future.result()
+        except Exception:
+            LOGGER.exception("Fehler beim Laden der MOSMIX Daten")
+            failed_sources.add("mosmix")
+
+        try:
+            warnings = warnings_future.result()
+        except Exception:
+            LOGGER.exception("Fehler beim Laden der Wetterwarnungen")
+            failed_sources.add("warnings")
+
+    if previous is not None and len(failed_sources) == 2:
+        updated_at = previous.updated_at
+    else:
+        updated_at = datetime.now(TIMEZONE)
 
     data = WeatherData(
-        updated_at=datetime.now(TIMEZONE),
+        updated_at=updated_at,
         hourly=hourly,
         today_summary=today_summary,
         warnings=warnings,
+        issue_time=issue_time,
     )
-    WEATHER_CACHE.set(data)
+    WEATHER_CACHE.set(data, failed_sources)
     return data